@@ -1,5 +1,9 @@
+import csv
+import glob
+import zlib
+import numpy as np
 import pandas as pd
-from numpy import nan
+from collections import OrderedDict
 from .utils import *
 import os
 
@@ -12,36 +16,97 @@ class DataTable(object):
         save(path) - export in csv
         to_csv_string - return data frame as string in csv format
         get(query) - return data frame extraction
+        get_many(queries) - return the extractions of several queries at once
         delete(query) - cancel data from data frame
         edit(query) - replace data in data frame
         append(query) - add data in data frame
     """
 
-    def __init__(self, path_or_dict=None, sep=';', replace_nan=None):
+    _MASK_CACHE_SIZE = 32
+    _INDEX_MIN_READS = 3
+    _INDEX_LIMIT = 4
+    _SAVE_CHUNK_SIZE = 100_000
+
+    def __init__(self, path_or_dict=None, sep=';', replace_nan=None, dtype=None, pyarrow_engine=False,
+                 parquet_cache=False, validate=True):
         """
         Initialize data table
         Args:
             path_or_dict: <str> or <dict> path to file or dictionary representation
             sep: <str> separator symbol
             replace_nan: replace nan with the given value, if None there will be no replacement
+            dtype: <type> or <dict> {column: type} forwarded to the csv reader to skip type inference
+            pyarrow_engine: True to parse the csv with pyarrow when it is installed and no dtype is given.
+                            pyarrow infers more types than the default engine (e.g. ISO dates)
+            parquet_cache: True to keep a parsed copy of the csv in a hidden parquet file next to it,
+                           read instead of the csv while the csv is not modified
+            validate: False to skip the checks on the queries, for trusted callers
         """
+        self.__sep = sep
+        self.__pyarrow_engine = pyarrow_engine
+        self.__validate = validate
+        self.__dtype = dtype
+        self.__parquet_cache = parquet_cache
+        self.__path = None
+        self._mask_cache = OrderedDict()
+        self._indexes = OrderedDict()
+        self._index_reads = {}
+        self._pending = []
+        self._columns_set = None
+
         if isinstance(path_or_dict, str):
             assert os.path.exists(path_or_dict), " <DataTable.__init__> Given path does not exist."
             self.__path = path_or_dict
             self.__load(replace_nan)
         elif isinstance(path_or_dict, dict):
             self.__load_from_dict(path_or_dict)
-            self.__path = None
         else:
             self._df = pd.DataFrame()
-        self.__sep = sep
 
         self.__keywords = {'columns', 'state', 'values'}
 
     def __load(self, replace_nan):
-        self._df = pd.read_csv(self.__path, sep=self.__sep)
+        cache = self.__parquet_path()
+        loaded = False
+        if cache is not None and os.path.exists(cache) \
+                and os.path.getmtime(cache) >= os.path.getmtime(self.__path):
+            try:
+                self._df = pd.read_parquet(cache)
+                loaded = True
+            except (ImportError, ValueError, OSError):
+                pass
+        if not loaded:
+            self.__read_csv()
+            if cache is not None:
+                try:
+                    self._df.to_parquet(cache, index=False)
+                except (ImportError, TypeError, ValueError, OSError):
+                    pass
         if replace_nan is not None:
-            self._df = self._df.replace(nan, '', regex=True)
+            self._df = self._df.fillna(replace_nan)
+        self.__invalidate()
+
+    def __read_csv(self):
+        if self.__pyarrow_engine and self.__dtype is None:
+            try:
+                self._df = pd.read_csv(self.__path, sep=self.__sep, engine='pyarrow')
+                return
+            except (ImportError, ValueError):
+                pass
+        # low_memory is a C engine option, longer separators are parsed by the python engine
+        options = {'low_memory': False} if len(self.__sep) == 1 else {}
+        self._df = pd.read_csv(self.__path, sep=self.__sep, dtype=self.__dtype, **options)
+
+    def __parquet_path(self):
+        """
+        Path of the parquet cache of the csv file, None if the cache is disabled.
+        The name depends on the parsing options, so a cache is only read back with the options that wrote it.
+        """
+        if not self.__parquet_cache or self.__path is None:
+            return None
+        folder, name = os.path.split(self.__path)
+        options = repr((self.__sep, self.__dtype, self.__pyarrow_engine and self.__dtype is None))
+        return os.path.join(folder, f".{name}.{zlib.crc32(options.encode()):08x}.parquet")
 
     def __load_from_dict(self, table):
         """
@@ -49,6 +114,7 @@ class DataTable(object):
         :param table: <dict>
         """
         self._df = pd.DataFrame(table)
+        self.__invalidate()
 
     def save(self, path=None, sep=None):
         """
@@ -56,12 +122,20 @@ class DataTable(object):
         Args:
             path: <str> path to file
             sep: <str> separator symbol
-        Returns: None
+        Returns: None, nothing is written if there is neither a given path nor a loaded file
         """
         path = self.__path if path is None else path
         sep = self.__sep if sep is None else sep
+        if path is None:
+            return
+
+        with open(path, 'w', buffering=1 << 20, encoding='utf-8', newline='') as file:
+            self._df.to_csv(file, sep=sep, index=False, chunksize=self._SAVE_CHUNK_SIZE)
 
-        self._df.to_csv(path, sep=sep, index=False)
+        if self.__parquet_cache and path == self.__path:
+            folder, name = os.path.split(path)
+            for cache in glob.glob(os.path.join(glob.escape(folder), f".{glob.escape(name)}.*.parquet")):
+                os.remove(cache)
 
     def to_string(self, sep=';'):
         """
@@ -71,12 +145,15 @@ class DataTable(object):
         Returns: string
         """
         sep = self.__sep if sep is None else sep
-        text = self._df.to_csv(path_or_buf=None, sep=sep, index=False)
+        try:
+            text = self._df.to_csv(path_or_buf=None, sep=sep, index=False,
+                                   quoting=csv.QUOTE_NONE, lineterminator='\n')
+        except csv.Error:
+            # some field holds the separator or a quote: let pandas quote it and strip the quotes
+            text = self._df.to_csv(path_or_buf=None, sep=sep, index=False, lineterminator='\n')
+            text = text.replace("\"", "")
 
-        text = text.replace("\"", "").replace("\r\n", "\n")
-        if text[-1] == '\n':
-            text = text[:-1]
-        return text
+        return text[:-1] if text.endswith('\n') else text
 
     def get(self, query=None, dict_type='list'):
         """
@@ -108,12 +185,58 @@ class DataTable(object):
         self.__query_validation(query, must_have={'state'}, source=self.get.__name__)
 
         table = self.__filter(query['state'])
+        return self.__extract(table, query, dict_type)
 
-        if 'columns' in query:
-            table = table[query['columns']]
-            if isinstance(table, pd.Series):
-                table = table.to_frame()
-        return table.to_dict(dict_type)
+    def get_many(self, queries, dict_type='list'):
+        """
+        Reads data from the data table for several queries at once.
+        The reads of the batch are counted once per set of state columns, so an index is built
+        before the queries on those columns are answered; the queries left are scanned sharing
+        each column: value comparison between them.
+        Args:
+            queries: <list> of queries with the same structure used by get
+            dict_type: Determines the type of the values of each dictionary, see get
+        Returns: <list> with the result of each query, in the same order
+        Examples:
+            queries = [{'state': {'animal': 'dog'}, 'columns': {'color'}},
+                       {'state': {'animal': 'cat'}, 'columns': {'color'}}]
+        """
+        should_be_type(list, queries, 'queries', f"DataTable.{self.get_many.__name__}")
+        for query in queries:
+            if isinstance(query, dict) and 'state' not in query:
+                query['state'] = {}
+            self.__query_validation(query, must_have={'state'}, source=self.get_many.__name__)
+
+        groups = {}
+        for i, query in enumerate(queries):
+            if query['state'] and self.__index_key(query['state']) is not None:
+                groups.setdefault(tuple(query['state']), []).append(i)
+        for fields, ids in groups.items():
+            if fields not in self._indexes:
+                self.__count_reads(fields, len(ids))
+
+        rows = [self.__index_lookup(query['state'], build=False) if query['state'] else None for query in queries]
+
+        matches = {}
+        for i, query in enumerate(queries):
+            if not query['state'] or rows[i] is not None:
+                continue
+            mask = np.ones(len(self._df), dtype=bool)
+            for field, value in query['state'].items():
+                try:
+                    key = (field, value)
+                    match = matches.get(key)
+                except TypeError:
+                    key, match = None, None
+                if match is None:
+                    match = self.__column_match(field, value)
+                    if key is not None:
+                        matches[key] = match
+                mask &= match
+            rows[i] = np.flatnonzero(mask)
+
+        return [self.__extract(self._df if positions is None else self._df.take(positions), query, dict_type)
+                for query, positions in zip(queries, rows)]
 
     def delete(self, query, save=True):
         """
@@ -126,7 +249,9 @@ class DataTable(object):
 
         self.__query_validation(query, must_have={'state'}, source=self.delete.__name__)
 
-        self._df = self._df[(self._df[query['state']] != pd.Series(query['state'])).all(axis=1)]
+        if query['state']:
+            self._df = self._df.iloc[~self.__filter_mask(query['state'])]
+            self.__invalidate()
 
         if save:
             self.save()
@@ -145,9 +270,10 @@ class DataTable(object):
 
         self.__query_validation(query, must_have={'state', 'values'}, source=self.edit.__name__)
 
-        state = query['state']
-        for kw in query['values']:
-            self._df.loc[(self._df[state] == pd.Series(state)).all(axis=1), kw] = query['values'][kw]
+        state, values = query['state'], query['values']
+        rows = self.__filter_mask(state) if state else slice(None)
+        self._df.loc[rows, list(values)] = list(values.values())
+        self.__invalidate()
 
         if save:
             self.save()
@@ -167,7 +293,12 @@ class DataTable(object):
         if not isinstance(save, bool):
             raise TypeError(f"<DataTable.Delete> Expected bool, given: {type(save)}")
 
-        self._df = self._df.append(pd.DataFrame(query['values']), ignore_index=True)
+        values = query['values']
+        if isinstance(values, list):
+            self._pending.append(pd.DataFrame.from_records(values))
+        else:
+            self._pending.append(pd.DataFrame(values))
+        self.__invalidate()
 
         if save:
             self.save()
@@ -188,41 +319,235 @@ class DataTable(object):
 
         table = self.__filter(query['state'])
         if 'columns' in query:
-            table = table[query['columns']]
+            table = self.__select(table, query['columns'])
 
         max_values = {}
         for col in table.columns:
             value = table[col].max()
-            max_values[col] = value if value is not nan else 0
-
-        return 0 if max_values is nan else max_values
+            if isinstance(value, np.generic):
+                value = value.item()
+            max_values[col] = 0 if pd.isna(value) else value
+        return max_values
 
     @property
     def columns(self):
         return self._df.columns
 
+    @property
+    def _df(self):
+        """
+        Data frame with the appended rows still pending merged in by a single concat
+        """
+        if self._pending:
+            self.__df = pd.concat([self.__df, *self._pending], ignore_index=True)
+            self._pending = []
+        return self.__df
+
+    @_df.setter
+    def _df(self, df):
+        self.__df = df
+
+    @classmethod
+    def __extract(cls, table, query, dict_type):
+        """
+        Convert the filtered table into the dictionary returned by get
+        """
+        if 'columns' in query:
+            table = cls.__select(table, query['columns'])
+        if dict_type == 'list' and table.columns.is_unique:
+            return {col: table[col].tolist() for col in table.columns}
+        return table.to_dict(dict_type)
+
+    @staticmethod
+    def __select(table, columns):
+        """
+        Extract the given columns as a data frame
+        :param columns: <str> column name or collection of column names
+        """
+        if isinstance(columns, (set, frozenset)):
+            columns = list(columns)
+        table = table[columns]
+        return table.to_frame() if isinstance(table, pd.Series) else table
+
     def __filter(self, state):
-        return self._df.loc[((self._df[state] == pd.Series(state)).all(axis=1))]
+        if not state:
+            return self._df
+        positions = self.__index_lookup(state)
+        if positions is None:
+            return self._df.iloc[self.__filter_mask(state)]
+        return self._df.take(positions)
+
+    def __index_lookup(self, state, build=True):
+        """
+        Positions of the rows matching the state, read from a hash index on the state columns.
+        The index of a set of columns is built once it has been read _INDEX_MIN_READS times
+        without changes of the data frame in between; at most _INDEX_LIMIT indexes are kept.
+        :param state: {column1: value1, ..., columnX: valueX}
+        :param build: False to only use an index already built, without counting the read
+        :return: <numpy.ndarray> of positions, None if there is no index to answer the state
+        """
+        fields = tuple(state)
+        key = self.__index_key(state)
+        if not fields or key is None:
+            return None
+
+        if fields in self._indexes:
+            self._indexes.move_to_end(fields)
+        elif not build:
+            return None
+        else:
+            self.__count_reads(fields, 1)
+            if fields not in self._indexes:
+                return None
+
+        uniques, steps, order, sorted_codes = self._indexes[fields]
+        try:
+            code = uniques[0].get_loc(key[0])
+            for unique, step, value in zip(uniques[1:], steps, key[1:]):
+                loc = unique.get_loc(value)
+                if not isinstance(code, (int, np.integer)) or not isinstance(loc, (int, np.integer)):
+                    return None
+                code = step.get_loc(code * len(unique) + loc)
+        except KeyError:
+            return np.empty(0, dtype=np.intp)
+        except (TypeError, ValueError, OverflowError):
+            return None
+        if not isinstance(code, (int, np.integer)):
+            return None
+        start, stop = np.searchsorted(sorted_codes, [code, code + 1])
+        return order[start:stop]
+
+    def __count_reads(self, fields, reads):
+        """
+        Record reads of a set of columns, building its index once _INDEX_MIN_READS is reached
+        """
+        self._index_reads[fields] = self._index_reads.get(fields, 0) + reads
+        if self._index_reads[fields] >= self._INDEX_MIN_READS:
+            self._indexes[fields] = self.__build_index(fields)
+            if len(self._indexes) > self._INDEX_LIMIT:
+                self._indexes.popitem(last=False)
+
+    def __index_key(self, state):
+        """
+        Values of the state as an index key, None if a hash lookup could give other rows than ==:
+        only numbers on numeric columns, booleans on boolean columns and strings on object columns are looked up
+        """
+        for field, value in state.items():
+            kind = self._df[field].dtype.kind
+            if isinstance(value, (bool, np.bool_)):
+                valid = kind == 'b'
+            elif isinstance(value, (int, float, np.integer, np.floating)):
+                valid = kind in 'iuf'
+            elif isinstance(value, str):
+                valid = kind == 'O'
+            else:
+                valid = False
+            if not valid:
+                return None
+        return tuple(state.values())
+
+    def __build_index(self, fields):
+        """
+        Factorize the given columns into one code per distinct row of values, rows with a missing value get -1
+        :param fields: <tuple> column names
+        :return: (distinct values of each column, code of each combination of columns,
+                  row positions sorted by code, sorted codes)
+        """
+        uniques, steps = [], []
+        codes = None
+        for field in fields:
+            column_codes, unique = pd.factorize(self._df[field])
+            uniques.append(pd.Index(unique))
+            if codes is None:
+                codes = column_codes
+                continue
+            missing = (codes < 0) | (column_codes < 0)
+            combined = codes * len(unique) + column_codes
+            combined[missing] = -1
+            codes, step = pd.factorize(combined)
+            codes[missing] = -1
+            steps.append(pd.Index(step))
+
+        order = np.argsort(codes, kind='stable')
+        return uniques, steps, order, codes[order]
+
+    def __filter_mask(self, state):
+        """
+        Boolean mask of the rows matching every column: value pair of the state
+        :param state: {column1: value1, ..., columnX: valueX}
+        :return: <numpy.ndarray> of bool, one element per row
+        """
+        try:
+            key = frozenset(state.items())
+        except TypeError:
+            key = None
+        if key in self._mask_cache:
+            self._mask_cache.move_to_end(key)
+            return self._mask_cache[key]
+
+        positions = self.__index_lookup(state, build=False)
+        if positions is None:
+            mask = np.ones(len(self._df), dtype=bool)
+            for field, value in state.items():
+                mask &= self.__column_match(field, value)
+        else:
+            mask = np.zeros(len(self._df), dtype=bool)
+            mask[positions] = True
+
+        if key is not None:
+            self._mask_cache[key] = mask
+            if len(self._mask_cache) > self._MASK_CACHE_SIZE:
+                self._mask_cache.popitem(last=False)
+        return mask
+
+    def __column_match(self, field, value):
+        """
+        Boolean mask of the rows of a column equal to value, missing values never match.
+        NumPy numeric columns are compared as arrays, the others through pandas
+        """
+        column = self._df[field]
+        if isinstance(column.dtype, np.dtype) and column.dtype.kind in 'biuf':
+            target = np.empty(1, dtype=object)
+            target[0] = value
+            return match_rows(column.to_numpy()[:, None], target)
+        return column.eq(value).to_numpy(dtype=bool, na_value=False)
+
+    def __invalidate(self):
+        """
+        Drop every cached lookup, to be called after any change of the data frame
+        """
+        self._mask_cache.clear()
+        self._indexes.clear()
+        self._index_reads.clear()
+        self._columns_set = None
 
     def __query_validation(self, query, must_have=None, source=""):
+        if not self.__validate:
+            return
+
         if not isinstance(query, dict):
             raise TypeError(f"<Base.FileSystem.{source}> Invalid type in input"
                             f"\n\t\tGot: {type(query)}, Expected: dict")
 
-        if not are_contained(set(query), self.__keywords):
+        if not set(query).issubset(self.__keywords):
             raise ValueError(f"<Base.FileSystem.{source}> Invalid keywords"
                              f"\n\t\tGot: {set(query)}, Expected: {self.__keywords}")
 
-        if must_have is not None:
-            assertion(set(extract_match(set(query), set(must_have))) == set(must_have),
+        if __debug__ and must_have is not None:
+            assertion(set(must_have).issubset(query),
                       f"<DataTable.__query_validation> Query kws: {set(query)}"
                       f"\nMust have: {set(must_have)}")
 
-        for kw in extract_match(set(query), self.__keywords):
+        if self._columns_set is None:
+            self._columns_set = frozenset(self._df.columns)
+
+        for kw in query:
             columns = query[kw] if kw == 'columns' else list(query[kw].keys())
-            if not are_contained(set(columns), set(self._df.columns)):
+            if isinstance(columns, str):
+                columns = [columns]
+            if not self._columns_set.issuperset(columns):
                 raise ValueError(f"<Base.FileSystem.{source}> Invalid keywords"
-                                 f"\n\t\tGot: {columns}, Expected: {set(self._df.columns)}")
+                                 f"\n\t\tGot: {columns}, Expected: {set(self._columns_set)}")
 
     @property
     def query_keys(self):
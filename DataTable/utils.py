@@ -1,7 +1,16 @@
+import posixpath
+import numpy as np
+
+_NUMBA_MIN_ROWS = 100_000
+_NUMBA_DTYPES = frozenset(np.dtype(t) for t in (np.int8, np.int16, np.int32, np.int64, np.uint8, np.uint16,
+                                                  np.uint32, np.uint64, np.float32, np.float64))
+_match_rows_jit = None
+_numba_errors = ()
+_numba_loaded = False
+
+
 def are_contained(set1, set2):
-    ls1 = extract_match(set1, set2)
-    ls2 = extract_match(set2, set1)
-    return set(ls1) == set(ls2)
+    return set(set1) == set(set2)
 
 
 def extract_match(list1, list2):
@@ -29,8 +38,55 @@ def read_file(path):
 
 
 def normalize_path(path):
-    if '\\' in path:
-        path = path.replace('\\', '/')
-    if path[-1] == '/':
-        path = path[: -1]
-    return path
+    return posixpath.normpath(path.replace('\\', '/'))
+
+
+def match_rows(values, target):
+    """
+    Boolean mask of the rows of a 2D array equal to target in every column.
+    Numeric arrays are compared with the target cast to their dtype, those of at least _NUMBA_MIN_ROWS rows
+    and of a dtype in _NUMBA_DTYPES go through a Numba kernel when Numba is installed.
+    """
+    if values.dtype.kind in 'iuf':
+        try:
+            typed = np.asarray(target, dtype=values.dtype)
+        except (TypeError, ValueError, OverflowError):
+            typed = None
+        if typed is not None and (typed == target).all():
+            if values.shape[0] >= _NUMBA_MIN_ROWS and values.dtype in _NUMBA_DTYPES \
+                    and _load_numba() is not None:
+                try:
+                    return _match_rows_jit(np.ascontiguousarray(values), typed)
+                except _numba_errors:
+                    pass
+            target = typed
+    return (values == target).all(axis=1)
+
+
+def _load_numba():
+    """
+    Compile the Numba kernel of match_rows on first use, None if Numba is not installed
+    """
+    global _match_rows_jit, _numba_errors, _numba_loaded
+    if _numba_loaded:
+        return _match_rows_jit
+    _numba_loaded = True
+    try:
+        import numba
+        from numba.core.errors import NumbaError
+    except Exception:
+        return None
+
+    @numba.njit(parallel=True, cache=True)
+    def match_rows_jit(values, target):
+        mask = np.ones(values.shape[0], dtype=np.bool_)
+        for i in numba.prange(values.shape[0]):
+            for j in range(values.shape[1]):
+                if values[i, j] != target[j]:
+                    mask[i] = False
+                    break
+        return mask
+
+    _numba_errors = (NumbaError, NotImplementedError)
+    _match_rows_jit = match_rows_jit
+    return _match_rows_jit
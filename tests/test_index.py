@@ -0,0 +1,71 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from DataTable import DataTable
+
+
+TABLE = {
+    'num': [0, 1, 1, 2, 2, 3],
+    'real': [0.5, 1.0, np.nan, 2.0, 1.0, 0.5],
+    'flag': [True, False, False, True, True, False],
+    'name': ['a', 'b', 'b', None, 'a', '1'],
+    'qty': pd.array([5, None, 3, 5, 3, None], dtype='Int64'),
+    'day': pd.to_datetime(['2020-01-01', '2020-01-02', '2020-01-01', '2020-02-01', '2020-01-02', '2020-01-01']),
+}
+
+STATES = [
+    {'num': 1}, {'num': 1.0}, {'num': 1.5}, {'num': True}, {'num': '1'}, {'num': 2 ** 70},
+    {'real': 1}, {'real': np.nan}, {'real': 0.5},
+    {'flag': False}, {'flag': 1}, {'flag': 0},
+    {'name': 'a'}, {'name': 1}, {'name': '1'}, {'name': 'zz'},
+    {'qty': 5}, {'qty': 3.0},
+    {'day': '2020-01-01'}, {'day': '2020-01'}, {'day': pd.Timestamp('2020-01-02')},
+    {'num': 2, 'name': 'a'}, {'name': 'b', 'flag': False}, {'num': 2, 'real': 2.0, 'qty': 5},
+]
+
+
+class IndexScanTest(unittest.TestCase):
+    """
+    A state gives the same rows whether it is answered by a scan or by the hash index built after repeated reads
+    """
+
+    def assert_same(self, state, method):
+        scanned = DataTable(TABLE)
+        indexed = DataTable(TABLE)
+        for _ in range(DataTable._INDEX_MIN_READS):
+            indexed.get({'state': dict(state)})
+        self.assertEqual(str(method(scanned, state)), str(method(indexed, state)), state)
+
+    def test_get(self):
+        for state in STATES:
+            self.assert_same(state, lambda table, s: table.get({'state': dict(s)}))
+
+    def test_max(self):
+        for state in STATES:
+            self.assert_same(state, lambda table, s: table.max({'state': dict(s), 'columns': ['num', 'real']}))
+
+    def test_delete(self):
+        def delete(table, state):
+            table.delete({'state': dict(state)}, save=False)
+            return table.get()
+
+        for state in STATES:
+            self.assert_same(state, delete)
+
+    def test_get_many(self):
+        for repeat in (1, DataTable._INDEX_MIN_READS):
+            queries = [{'state': dict(state)} for state in STATES for _ in range(repeat)]
+            expected = [DataTable(TABLE).get({'state': dict(query['state'])}) for query in queries]
+            self.assertEqual(str(DataTable(TABLE).get_many(queries)), str(expected))
+
+    def test_index_is_used(self):
+        table = DataTable(TABLE)
+        for _ in range(DataTable._INDEX_MIN_READS):
+            table.get({'state': {'num': 2, 'name': 'a'}})
+        self.assertIn(('num', 'name'), table._indexes)
+
+
+if __name__ == '__main__':
+    unittest.main()